@@ -0,0 +1,391 @@
+import argparse
+import contextlib
+import csv
+import io
+import json
+import keyword
+import logging
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+# ---------------------------------------------------------------------
+# Project folders
+# ---------------------------------------------------------------------
+src_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for folder in ("libraries", "make_exercises", "solve_llama"):
+    folder_path = os.path.join(src_path, folder)
+    if folder_path not in sys.path:
+        sys.path.append(folder_path)
+
+from data_access import Exercise, load_exercises_from_csv, save_exercises_to_csv
+from randomize_questions import generate_random_variation
+from solve_questions import parse_vars_no_units
+import solve_questions
+from toolbox_textParsing import extract_final_bit
+from answer_extraction import extract_answers
+
+# Parameters
+dataset_csv_path = os.path.join(src_path, "..", "DATA", "DatasetPython5.csv")
+history_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.jsonl")
+
+# The single regex extract_final_bit used before answer_extraction, kept as a reference point
+LEGACY_ANSWER_PATTERN = re.compile(r"<A>(.*?)<\\A>", re.DOTALL)
+
+SEED = 1234
+REGRESSION_THRESHOLD = 1.25  # Flag a benchmark slower than 1.25x its historical median
+HISTORY_WINDOW = 10  # Number of previous results the median is taken over
+
+
+def load_dataset_rows(csv_path):
+    """
+    Reads the ';'-separated dataset into a list of dict rows.
+    """
+    with open(csv_path, mode='r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f, delimiter=';'))
+
+
+def scale_rows(rows, n):
+    """
+    Repeats the dataset rows until n rows are obtained.
+    """
+    return [dict(rows[i % len(rows)]) for i in range(n)]
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def write_rows(rows, csv_path):
+    with open(csv_path, mode='w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=rows[0].keys(), delimiter=';')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+WELL_FORMED_ENDINGS = [
+    "<A> {value} {unit} <\\A>",
+    "<A> [{value}] [{unit}] <\\A>\nLet me double check.\n<A> {value} {unit} <\\A>",
+]
+MALFORMED_ENDINGS = [
+    "<A> {value} {unit} </A>",
+    "The final answer is {value} {unit}.",
+    "<A> {value} {unit}",
+]
+
+
+def make_answers(rows, n, rng, endings=WELL_FORMED_ENDINGS + MALFORMED_ENDINGS):
+    """
+    Builds a synthetic corpus of n model answers: a long step-by-step explanation
+    followed by one of endings, by default a well-formed, malformed or missing <A> ... <\\A> block.
+    """
+    answers = []
+    for i in range(n):
+        row = rows[i % len(rows)]
+        explanation = (row["Test Answer"] + "\n") * rng.randint(2, 20)
+        ending = rng.choice(endings).format(value=row["Numeric answer"], unit=row["Units 1"])
+        answers.append(explanation + ending)
+    return answers
+
+
+def make_huge_malformed_answers(n, rng, size=50000):
+    """
+    Builds n huge answers (size characters) that mention <A> many times but never close it.
+    """
+    answers = []
+    for _ in range(n):
+        chunks = []
+        while sum(len(c) for c in chunks) < size:
+            chunks.append(f"<A> {rng.uniform(0, 100):.2f} m " + "x" * rng.randint(200, 2000) + "\n")
+        answers.append("".join(chunks))
+    return answers
+
+
+def with_valid_solve_function(row):
+    """
+    Returns a copy of a dataset row whose "Solve function" is replaced by a synthetic but
+    valid function of its variables. Most dataset functions separate their parameters
+    with ';' and fail at exec, which would make exec_solve time error handling only.
+    """
+    names = [name for name in parse_vars_no_units(row["Variables (no units)"])
+             if name.isidentifier() and not keyword.iskeyword(name)]
+    body = " * ".join(names) or "1.0"
+    row = dict(row)
+    row["Solve function"] = (
+        f"def solve({', '.join(names + ['**others'])}): result = {body}; "
+        f"return f'{{result}} ' + {row['Units 1']!r}"
+    )
+    return row
+
+
+class InvalidBenchmark(Exception):
+    """
+    Raised by a benchmark setup when the timed code would not do the work it is named after.
+    """
+
+
+def legacy_extract_final_bit(answer):
+    match = LEGACY_ANSWER_PATTERN.search(answer)
+    return match.group(1).strip() if match else ""
+
+
+def time_it(func, repeat):
+    """
+    Returns the best wall time (in seconds) of repeat calls to func().
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_csv_roundtrip(rows, n, tmp_dir):
+    exercises = [
+        Exercise(
+            level_us=r["Level US"],
+            level_fr=r["Level FR"],
+            question=r["Question"],
+            test_answer=r["Test Answer"],
+            numeric_answer=to_float(r["Numeric answer"]),
+            units_1=r["Units 1"],
+            units_2="",
+            units_3="",
+        )
+        for r in scale_rows(rows, n)
+    ]
+    csv_path = os.path.join(tmp_dir, "exercises.csv")
+
+    def run():
+        save_exercises_to_csv(exercises, csv_path)
+        load_exercises_from_csv(csv_path)
+    return run
+
+
+def bench_random_variation(rows, n, tmp_dir):
+    scaled = scale_rows(rows, n)
+
+    def run():
+        random.seed(SEED)
+        for r in scaled:
+            generate_random_variation(r)
+    return run
+
+
+def bench_parse_vars(rows, n, tmp_dir):
+    strings = [r["Variables (no units)"] for r in scale_rows(rows, n)]
+
+    def run():
+        for s in strings:
+            parse_vars_no_units(s)
+    return run
+
+
+def bench_exec_solve(rows, n, tmp_dir):
+    csv_path = os.path.join(tmp_dir, "solve.csv")
+    write_rows([with_valid_solve_function(r) for r in scale_rows(rows, n)], csv_path)
+
+    def run():
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            solve_questions.main(csv_path)
+        return output.getvalue().count("Result =>")
+
+    solved = run()
+    if solved < n:
+        raise InvalidBenchmark(f"only {solved}/{n} rows solved")
+    return run
+
+
+def bench_extract_final_bit(rows, n, tmp_dir):
+    answers = make_answers(rows, n, random.Random(SEED))
+
+    def run():
+        for answer in answers:
+            extract_final_bit(answer)
+    return run
+
+
+def bench_extract_legacy_regex(rows, n, tmp_dir):
+    answers = make_answers(rows, n, random.Random(SEED))
+
+    def run():
+        for answer in answers:
+            legacy_extract_final_bit(answer)
+    return run
+
+
+def bench_extract_well_formed(rows, n, tmp_dir):
+    answers = make_answers(rows, n, random.Random(SEED), WELL_FORMED_ENDINGS)
+
+    def run():
+        extract_answers(answers)
+    return run
+
+
+def bench_extract_well_formed_legacy(rows, n, tmp_dir):
+    answers = make_answers(rows, n, random.Random(SEED), WELL_FORMED_ENDINGS)
+
+    def run():
+        for answer in answers:
+            legacy_extract_final_bit(answer)
+    return run
+
+
+def bench_extract_huge_malformed(rows, n, tmp_dir):
+    answers = make_huge_malformed_answers(n, random.Random(SEED))
+
+    def run():
+        for answer in answers:
+            extract_final_bit(answer)
+    return run
+
+
+def bench_extract_huge_malformed_legacy(rows, n, tmp_dir):
+    answers = make_huge_malformed_answers(n, random.Random(SEED))
+
+    def run():
+        for answer in answers:
+            legacy_extract_final_bit(answer)
+    return run
+
+
+def bench_llm_mock(rows, n, tmp_dir):
+    """
+    End-to-end run of ollamma_simple against a mock chat backend.
+    Requires pandas and ollama to be importable.
+    """
+    import ollamma_simple
+    # The solver configures INFO logging on import; keep the benchmark output quiet
+    logging.getLogger().setLevel(logging.WARNING)
+
+    answers = make_answers(rows, n, random.Random(SEED))
+    csv_path = os.path.join(tmp_dir, "llm.csv")
+    output_path = os.path.join(tmp_dir, "llm_answers.csv")
+    write_rows(scale_rows(rows, n), csv_path)
+    calls = iter(range(10 ** 9))
+
+    def mock_chat(model, messages, stream=False):
+        answer = answers[next(calls) % len(answers)]
+        return {"message": {"content": answer}, "prompt_eval_count": 200, "eval_count": len(answer) // 4}
+
+    def run():
+        for path in (output_path, os.path.splitext(output_path)[0] + "_metrics.jsonl"):
+            if os.path.exists(path):
+                os.remove(path)
+        ollamma_simple.chat = mock_chat
+        ollamma_simple.main(csv_path, output_path)
+    return run
+
+
+# name -> (setup function, number of items at scale 1)
+BENCHMARKS = {
+    "csv_roundtrip": (bench_csv_roundtrip, 5000),
+    "generate_random_variation": (bench_random_variation, 5000),
+    "parse_vars_no_units": (bench_parse_vars, 50000),
+    "exec_solve": (bench_exec_solve, 2000),
+    "extract_final_bit": (bench_extract_final_bit, 20000),
+    "extract_legacy_regex": (bench_extract_legacy_regex, 20000),
+    "extract_well_formed": (bench_extract_well_formed, 20000),
+    "extract_well_formed_legacy": (bench_extract_well_formed_legacy, 20000),
+    "extract_huge_malformed": (bench_extract_huge_malformed, 20),
+    "extract_huge_malformed_legacy": (bench_extract_huge_malformed_legacy, 20),
+    "llm_mock_end_to_end": (bench_llm_mock, 500),
+}
+
+
+def load_history(path):
+    history = []
+    if os.path.exists(path):
+        with open(path, mode='r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    history.append(json.loads(line))
+    return history
+
+
+def check_regression(result, history, threshold):
+    """
+    Compares a result with the median of the last HISTORY_WINDOW results of the same
+    benchmark and size. Returns the slowdown ratio, or None if there is no history.
+    """
+    previous = [
+        h["seconds"] for h in history
+        if h["name"] == result["name"] and h["n"] == result["n"]
+    ][-HISTORY_WINDOW:]
+    if not previous:
+        return None
+    return result["seconds"] / statistics.median(previous)
+
+
+def main(names=None, scale=1.0, repeat=3, history_path=history_path, threshold=REGRESSION_THRESHOLD, record=True):
+    """
+    Runs the benchmarks, appends the results to the history file and reports regressions.
+
+    Returns:
+        The list of benchmark names that regressed beyond threshold.
+    """
+    logging.getLogger().setLevel(logging.WARNING)
+    rows = load_dataset_rows(dataset_csv_path)
+    history = load_history(history_path)
+    regressions = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in names or BENCHMARKS:
+            setup, base_n = BENCHMARKS[name]
+            n = max(1, int(base_n * scale))
+            try:
+                run = setup(rows, n, tmp_dir)
+            except (ImportError, InvalidBenchmark) as e:
+                print(f"{name:30s} skipped ({e})")
+                continue
+            seconds = time_it(run, repeat)
+            result = {
+                "name": name,
+                "n": n,
+                "seconds": seconds,
+                "per_item_us": seconds / n * 1e6,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "seed": SEED,
+            }
+            ratio = check_regression(result, history, threshold)
+            status = ""
+            if ratio is not None:
+                status = f"x{ratio:.2f} vs median"
+                if ratio > threshold:
+                    status += "  REGRESSION"
+                    regressions.append(name)
+            print(f"{name:30s} n={n:<7d} {seconds:9.4f}s {result['per_item_us']:10.2f}us/item  {status}")
+
+            if record:
+                with open(history_path, mode='a', encoding='utf-8') as f:
+                    f.write(json.dumps(result) + "\n")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the data generation, parsing and solving hot paths.")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run among {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier of the synthetic dataset sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs; the best time is kept")
+    parser.add_argument("--history", default=history_path, help="JSONL file the results are appended to")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Slowdown ratio flagged as a regression")
+    parser.add_argument("--no-record", action="store_true", help="Do not append the results to the history file")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    regressed = main(args.names, args.scale, args.repeat, args.history, args.threshold, not args.no_record)
+    sys.exit(1 if regressed else 0)
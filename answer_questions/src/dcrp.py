@@ -0,0 +1,223 @@
+"""
+Single entry point for the DCRP tools.
+
+    python dcrp.py ingest [--tex ...] [--output ...] [--dataset ...]
+    python dcrp.py generate <input_csv> <output_csv> [--variations 3] [--seed 0]
+    python dcrp.py solve [--input ...] [--output ...] [--model ...] [--workers 1] [--schedule longest-first]
+    python dcrp.py cot [--input ...] [--output ...] [--model ...] [--iterations 3]
+    python dcrp.py score <answers_csv> [--reextract] [--tolerance 0.02] [--output scored.csv]
+    python dcrp.py bench [names ...] [--scale 1.0] [--repeat 3] [--history ...] [--threshold 1.25] [--no-record]
+    python dcrp.py register <answers_csv> [--run-id ...] [--model ...] [--strategy ...] [--metrics ...] [--stored-snippets]
+    python dcrp.py analyze [--by model strategy "Level US"] [--compare run_id run_id ...]
+
+Every option can also be given in a JSON config file (--config, before or after the
+subcommand), either at the top level or in a section named after the subcommand,
+e.g. {"solve": {"model": "llama3.1:8b"}}.
+Heavy dependencies (pandas, ollama) are only imported by the subcommands that need them.
+"""
+import argparse
+import json
+import os
+import sys
+
+src_path = os.path.dirname(os.path.abspath(__file__))
+data_path = os.path.join(src_path, "..", "DATA")
+
+
+def use_folders(*folders):
+    """
+    Adds project folders (libraries, make_exercises, ...) to sys.path.
+    """
+    for folder in folders:
+        folder_path = os.path.join(src_path, folder)
+        if folder_path not in sys.path:
+            sys.path.append(folder_path)
+
+
+def run_ingest(args):
+    use_folders("make_exercises")
+    import logging
+    import tex_ingest
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    tex_ingest.main(args.tex, args.output, args.dataset)
+
+
+def run_generate(args):
+    use_folders("make_exercises")
+    import random
+    import randomize_questions
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    randomize_questions.main(args.input, args.output, args.variations)
+
+
+def run_solve(args):
+    use_folders("libraries", "solve_llama")
+    import ollamma_simple
+
+    ollamma_simple.main(args.input, args.output, args.model, args.workers, args.schedule)
+
+
+def run_cot(args):
+    use_folders("libraries", "solve_llama")
+    import ollamma_COT
+
+    ollamma_COT.main(args.input, args.output, args.model, args.iterations)
+
+
+def run_score(args):
+    use_folders("libraries")
+    import csv
+    import scoring
+
+    rows, summary = scoring.score_csv(args.answers, args.reextract, args.tolerance)
+    if not rows:
+        print(f"No answers to score in {args.answers}")
+        return 0
+    for key in ["all"] + sorted(k for k in summary if k != "all"):
+        correct, total = summary[key]
+        print(f"{key:15s} {correct:5d}/{total:<5d} {correct / total:7.1%}")
+
+    if args.output and rows:
+        with open(args.output, mode='w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=rows[0].keys(), delimiter=';')
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def run_bench(args):
+    use_folders("benchmarks")
+    import run_benchmarks
+
+    regressed = run_benchmarks.main(args.names or None, args.scale, args.repeat,
+                                    args.history or run_benchmarks.history_path,
+                                    args.threshold, not args.no_record)
+    return 1 if regressed else 0
+
+
+def run_register(args):
+    use_folders("libraries")
+    import logging
+    import run_store
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = run_store.RunStore(args.store)
+    store.register(args.answers, args.run_id, args.model, args.strategy, args.metrics, not args.stored_snippets)
+
+
+def run_analyze(args):
+    use_folders("libraries")
+    import run_store
+
+    store = run_store.RunStore(args.store)
+    if args.compare:
+        comparison = store.compare(args.compare, args.column)
+        print(comparison.to_string())
+        numeric = comparison.select_dtypes("number")
+        if len(numeric.columns):
+            print(numeric.mean().to_string())
+    else:
+        print(store.cube(args.by).to_string(float_format=lambda x: f"{x:.3f}"))
+
+
+def load_config(path):
+    if not path:
+        return {}
+    with open(path, mode='r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_parser(config):
+    parser = argparse.ArgumentParser(prog="dcrp", description="Generate, solve and score DCRP exercises.")
+    parser.add_argument("--config", help="JSON file with default values for the options")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("ingest", help="Synchronize the dataset with the TeX corpus")
+    p.add_argument("--tex", default=os.path.join(src_path, "..", "..", "make_exercises", "TEX", "questions_stanfordMath.tex"))
+    p.add_argument("--output", default=os.path.join(data_path, "DatasetPython5_tex.csv"))
+    p.add_argument("--dataset", default=os.path.join(data_path, "DatasetPython5.csv"),
+                   help="Curated dataset whose columns are kept where the TeX gives nothing")
+    p.set_defaults(func=run_ingest)
+
+    p = subparsers.add_parser("generate", help="Generate random variations of a dataset")
+    p.add_argument("input", nargs="?", default=os.path.join(data_path, "DatasetPython5.csv"))
+    p.add_argument("output", nargs="?", default=os.path.join(data_path, "DatasetPython5_variations.csv"))
+    p.add_argument("--variations", type=int, default=3, help="Variations generated per row")
+    p.add_argument("--seed", type=int, default=None)
+    p.set_defaults(func=run_generate)
+
+    p = subparsers.add_parser("solve", help="Answer the questions with a single prompt")
+    p.add_argument("--input", default=os.path.join(data_path, "DatasetPython5.csv"))
+    p.add_argument("--output", default=os.path.join(data_path, "DatasetPython5_answers.csv"))
+    p.add_argument("--model", default="llama3.1:latest")
+    p.add_argument("--workers", type=int, default=1, help="Concurrent chat calls")
+    p.add_argument("--schedule", default="longest-first", choices=["dataset", "longest-first", "grouped"],
+                   help="Order in which the rows are submitted")
+    p.set_defaults(func=run_solve)
+
+    p = subparsers.add_parser("cot", help="Answer the questions, re-prompting only on dimensionally inconsistent answers")
+    p.add_argument("--input", default=os.path.join(data_path, "DatasetPython5.csv"))
+    p.add_argument("--output", default=os.path.join(data_path, "DatasetPython5_answers-COT.csv"))
+    p.add_argument("--model", default="llama3.1:latest")
+    p.add_argument("--iterations", type=int, default=3, help="Maximum number of turns per question")
+    p.set_defaults(func=run_cot)
+
+    p = subparsers.add_parser("score", help="Score an answers CSV against the expected numeric answers")
+    p.add_argument("answers")
+    p.add_argument("--reextract", action="store_true", help="Re-extract snippets from the answers")
+    p.add_argument("--tolerance", type=float, default=0.02, help="Relative tolerance on the value")
+    p.add_argument("--output", help="Write the scored rows to this CSV")
+    p.set_defaults(func=run_score)
+
+    p = subparsers.add_parser("bench", help="Run the benchmark suite")
+    p.add_argument("names", nargs="*")
+    p.add_argument("--scale", type=float, default=1.0)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--history", help="JSONL file the results are appended to (default: benchmarks/history.jsonl)")
+    p.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio flagged as a regression")
+    p.add_argument("--no-record", action="store_true", help="Do not append the results to the history file")
+    p.set_defaults(func=run_bench)
+
+    p = subparsers.add_parser("register", help="Add an answers CSV to the run store")
+    p.add_argument("answers")
+    p.add_argument("--store", default=os.path.join(data_path, "runs"))
+    p.add_argument("--run-id", help="Defaults to the CSV file name")
+    p.add_argument("--model", help="Defaults to the model recorded in the metrics")
+    p.add_argument("--strategy", help="Defaults to cot or simple, from the CSV columns")
+    p.add_argument("--metrics", help="Defaults to <answers>_metrics.jsonl")
+    p.add_argument("--stored-snippets", action="store_true",
+                   help="Score the stored Final Snippet instead of re-extracting it from the answers")
+    p.set_defaults(func=run_register)
+
+    p = subparsers.add_parser("analyze", help="Compare the runs of the run store")
+    p.add_argument("--store", default=os.path.join(data_path, "runs"))
+    p.add_argument("--by", nargs="+", default=["model", "strategy", "Level US"],
+                   help="Dimensions of the accuracy and latency cube")
+    p.add_argument("--compare", nargs="+", metavar="RUN_ID", help="Join these runs question by question")
+    p.add_argument("--column", default="Correct", help="Column compared with --compare, e.g. Correct or \"Parsed unit\"")
+    p.set_defaults(func=run_analyze)
+
+    # Config values override the built-in defaults, command-line arguments override both
+    shared = {k: v for k, v in config.items() if not isinstance(v, dict)}
+    for name, subparser in subparsers.choices.items():
+        # --config is also accepted after the subcommand (it is read before parsing)
+        subparser.add_argument("--config", default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+        subparser.set_defaults(**{**shared, **config.get(name, {})})
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    pre_parser = argparse.ArgumentParser(add_help=False)
+    pre_parser.add_argument("--config")
+    config_args, _ = pre_parser.parse_known_args(argv)
+
+    parser = build_parser(load_config(config_args.config))
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
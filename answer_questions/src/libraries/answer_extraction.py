@@ -0,0 +1,191 @@
+import re
+
+# One automaton for every <A> tag variant seen in model outputs:
+# opening "<A>", "< A >", "<ANSWER>" and closing "<\A>", "</A>", "<\\A>", "< /A >", "</ANSWER>".
+_TAG = re.compile(r"<\s*([/\\]{0,2})\s*A(?:NSWER)?\s*>")
+
+# The last block when it needs no cleaning: "<A>", a number then single-spaced words without
+# LaTeX, brackets or "$", any closing tag, and no other "<" nor trailing unit after it.
+# iter_answer_blocks would yield it first and clean_snippet return it unchanged, so one match at
+# the last "<A>" (found with str.rfind) is enough for most model answers.
+_CLEAN_LAST = re.compile(
+    r"<A> ?(-?\d[^\s<\\\[\]$]*(?: [^\s<\\\[\]$]+)*) ?<\s*[/\\]{1,2}\s*A(?:NSWER)?\s*>[^<\[]*\Z"
+)
+
+# Unit left outside a closed block, as in "<A>75</A> [m]" or "$<A>6</A>$ [hours]"
+_TRAILING_UNIT = re.compile(r"[ \t]*\$?[ \t]*\[([^\]\n]{1,20})\]")
+
+# LaTeX wrappers dropped from snippets: \( \) \[ \] \, and \mathrm{...}
+_LATEX_WRAPPER = re.compile(r"\\[()\[\],]|\\mathrm\{([^}]*)\}")
+
+# Placeholders copied from the prompt format "<A> [numeric result] [units] <\A>"
+_PLACEHOLDERS = ("numeric result", "units")
+
+# A number (with optional thousands separators and power of ten) followed by an optional unit.
+# It starts with a character set ("-" only when a digit follows) so that searches skip ahead to it.
+_NUMBER_UNIT = re.compile(
+    r"(?P<value>[-−\d](?:(?<=\d)|(?=\d))[\d,]*(?:\.\d+)?"
+    r"(?:\s*(?:[x×*]|\\times|\\cdot)\s*10\s*\^\s*\{?\s*[-−]?\d+(?:\s*\})?|\s*\^\s*\{?\s*[-−]?\d+(?:\s*\})?|[eE][-+]?\d+)?)"
+    r"(?:[ \t]*(?:\\,|~)?[ \t]*(?:\\mathrm\{(?P<mathrm>[^}]*)\}|(?P<unit>[A-Za-zμΩ°%$][\w/^·.*²³μΩ°%-]*)))?"
+)
+
+# "2.4 \times 10^{-17}", "6 * 10^5" and bare powers such as "10^5"
+_POWER_OF_TEN = re.compile(r"(?:[x×*]|\\times|\\cdot)\s*10\s*\^\s*\{?\s*(-?\d+)")
+_BARE_POWER = re.compile(r"(-?[\d.]+)\s*\^\s*\{?\s*(-?\d+)\s*\}?")
+
+_DIGIT = re.compile(r"\d")
+
+# Greedy match up to the last digit of a string
+_LAST_DIGIT = re.compile(r".*\d", re.DOTALL)
+
+# Only the end of an untagged answer is searched for a bare final number
+FALLBACK_TAIL = 300
+
+
+def _first_line(text: str) -> str:
+    return text.strip().split("\n", 1)[0].strip()
+
+
+def _unit(match) -> str:
+    return (match.group("mathrm") or match.group("unit") or "").rstrip(".,")
+
+
+def iter_answer_blocks(answer: str):
+    """
+    Yields the content of every <A> ... <\\A> block of an answer, from the last to the first,
+    in a single backward pass: str.rfind jumps from "<" to "<", so only the end of a long
+    explanation is read to find the last block.
+    A block opened but never closed ends at the next opening tag, or at the end of its line;
+    a closing tag that closes no block is ignored.
+    """
+    end = len(answer)  # Where a block left open at the current tag stops
+    close = None  # Closing tag of the block being read backwards
+    pos = answer.rfind("<")
+    while pos != -1:
+        tag = _TAG.match(answer, pos)
+        if tag is None:
+            pass
+        elif tag.group(1):
+            # Of two closing tags in a row, only the first one closes the block
+            close = tag
+        else:
+            if close is None:
+                yield _first_line(answer[tag.end():end])
+            else:
+                block = answer[tag.end():close.start()].strip()
+                unit = _TRAILING_UNIT.match(answer, close.end())
+                if unit and unit.group(1) not in _PLACEHOLDERS:
+                    block = f"{block} {unit.group(1)}"
+                yield block
+                close = None
+            end = pos
+        pos = answer.rfind("<", 0, pos)
+
+
+def clean_snippet(snippet: str) -> str:
+    """
+    Removes the formatting models wrap around the final result:
+    "[2] [hours]" -> "2 hours", "$2.4 \\times 10^{-17}$ [m]" -> "2.4 \\times 10^{-17} m",
+    "\\(5\\) \\(\\mathrm{m/s^2}\\)" -> "5 m/s^2".
+    """
+    if "\\" in snippet:
+        snippet = _LATEX_WRAPPER.sub(r" \1 ", snippet)
+    if "[" in snippet or "$" in snippet:
+        snippet = snippet.replace("[", " ").replace("]", " ").replace("$", " ")
+    return " ".join(snippet.split())
+
+
+def recover_trailing_value(answer: str) -> str:
+    """
+    Returns the last "number [unit]" found at the end of an answer without <A> tags,
+    or an empty string.
+    """
+    tail_start = max(0, len(answer) - FALLBACK_TAIL)
+    last_digit = _LAST_DIGIT.match(answer, tail_start)
+    if last_digit is None:
+        return ""
+    # Only the neighbourhood of the last digit, on its line, can hold the last number and its unit
+    end = last_digit.end()
+    start = max(tail_start, end - 60, answer.rfind("\n", 0, end) + 1)
+    last = None
+    for match in _NUMBER_UNIT.finditer(answer, start, end + 60):
+        last = match
+    if last is None:
+        return ""
+    return f"{last.group('value')} {_unit(last)}".strip()
+
+
+def extract_answer(answer: str, which: str = "last", fallback: bool = True) -> str:
+    """
+    Extracts the final result of a model answer.
+
+    Args:
+        answer: The full model answer.
+        which: "last" (default) or "first" <A> block when the answer contains several.
+        fallback: If no usable block is found, recover a bare trailing number + unit.
+
+    Returns:
+        The cleaned snippet, or an empty string if nothing was found.
+    """
+    if not isinstance(answer, str):
+        return ""
+
+    if which == "last":
+        # rfind returns -1 when there is no "<A>", where the match simply fails
+        clean = _CLEAN_LAST.match(answer, answer.rfind("<A>"))
+        if clean:
+            return clean.group(1)
+
+    snippet = ""
+    for block in iter_answer_blocks(answer):
+        block = clean_snippet(block)
+        if _DIGIT.search(block):
+            snippet = block
+            if which == "last":
+                break
+    if not snippet and fallback:
+        snippet = recover_trailing_value(answer)
+    return snippet
+
+
+def extract_answers(answers, which: str = "last", fallback: bool = True) -> list:
+    """
+    Batch version of extract_answer over an iterable of answers (e.g. a DataFrame column).
+    Missing values (None, NaN) give an empty string.
+    """
+    return [extract_answer(answer, which, fallback) for answer in answers]
+
+
+def split_value_unit(snippet: str):
+    """
+    Splits a snippet such as "2.19 * 10^-11 m" or "120,000 J" into (2.19e-11, "m") or (120000.0, "J").
+    Returns (None, "") if the snippet does not start with a number.
+    """
+    match = _NUMBER_UNIT.search(snippet or "")
+    if match is None:
+        return None, ""
+    value_str = match.group("value").replace(",", "").replace("−", "-")
+    power = _POWER_OF_TEN.search(value_str)
+    bare_power = _BARE_POWER.fullmatch(value_str)
+    try:
+        if power:
+            mantissa = re.match(r"-?[\d.]+", value_str).group(0)
+            value = float(mantissa) * 10.0 ** int(power.group(1))
+        elif bare_power:
+            value = float(bare_power.group(1)) ** int(bare_power.group(2))
+        else:
+            value = float(value_str)
+    except ValueError:
+        value = None
+    return value, _unit(match)
+
+
+def unit_text(snippet: str) -> str:
+    """
+    Returns everything after the first number of a snippet, e.g.
+    "20 radians per second." -> "radians per second", "9.81 m/s^2" -> "m/s^2".
+    """
+    match = _NUMBER_UNIT.search(snippet or "")
+    if match is None:
+        return ""
+    return snippet[match.end("value"):].strip(" \t.,;:")
@@ -0,0 +1,139 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+
+# Durations reported by the Ollama server are in nanoseconds
+NS_PER_S = 1.0e9
+
+# Server-side fields copied from every chat response
+SERVER_FIELDS = [
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+    "load_duration",
+    "total_duration",
+]
+
+RETRY_BACKOFF_S = 0.5  # Wait before the first retry of a failed chat call, doubled at each retry
+
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile of a list of numbers (q in [0, 100]).
+    Returns None for an empty list.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class MetricsSink:
+    """
+    Collects one record per chat call.
+    Each record is appended to a JSONL file (if a path is given) and kept in memory
+    so that a per-run summary can be reported at the end.
+    Records may come from several solver threads at once.
+    """
+
+    def __init__(self, jsonl_path=None, run_id=None):
+        self.jsonl_path = jsonl_path
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        self.records = []
+        self._lock = threading.Lock()
+
+    def record(self, **fields):
+        fields.setdefault("run_id", self.run_id)
+        with self._lock:
+            self.records.append(fields)
+            if self.jsonl_path:
+                with open(self.jsonl_path, mode='a', encoding='utf-8') as f:
+                    f.write(json.dumps(fields) + "\n")
+        return fields
+
+    def summary(self, group_by=None):
+        """
+        Summarizes the recorded calls, optionally grouped by a record field
+        (e.g. "level_us" or "iteration").
+
+        Returns:
+            A dict mapping group -> {calls, p50, p95, p99 (wall seconds),
+            prompt_tokens, eval_tokens, tokens_per_s, retries, queue_wait_s}.
+        """
+        groups = defaultdict(list)
+        for rec in self.records:
+            key = rec.get(group_by) if group_by else "all"
+            groups[key].append(rec)
+
+        report = {}
+        for key, recs in groups.items():
+            wall = [r["wall_s"] for r in recs]
+            eval_tokens = sum(r.get("eval_count") or 0 for r in recs)
+            eval_seconds = sum(r.get("eval_duration") or 0 for r in recs) / NS_PER_S
+            report[key] = {
+                "calls": len(recs),
+                "p50": percentile(wall, 50),
+                "p95": percentile(wall, 95),
+                "p99": percentile(wall, 99),
+                "prompt_tokens": sum(r.get("prompt_eval_count") or 0 for r in recs),
+                "eval_tokens": eval_tokens,
+                "tokens_per_s": eval_tokens / eval_seconds if eval_seconds else None,
+                "retries": sum(r.get("retries", 0) for r in recs),
+                "queue_wait_s": sum(r.get("queue_wait_s", 0.0) for r in recs),
+            }
+        return report
+
+    def log_report(self):
+        """
+        Logs p50/p95/p99 latency and aggregate tokens/s, overall,
+        by Level US and by CoT iteration.
+        """
+        for group_by in (None, "level_us", "iteration"):
+            title = f"by {group_by}" if group_by else "overall"
+            for key, s in sorted(self.summary(group_by).items(), key=lambda kv: str(kv[0])):
+                tokens_per_s = f"{s['tokens_per_s']:.1f}" if s["tokens_per_s"] else "n/a"
+                logging.info(
+                    f"Metrics {title} [{key}]: calls={s['calls']} "
+                    f"p50={s['p50']:.2f}s p95={s['p95']:.2f}s p99={s['p99']:.2f}s "
+                    f"prompt_tokens={s['prompt_tokens']} eval_tokens={s['eval_tokens']} "
+                    f"tokens/s={tokens_per_s} retries={s['retries']}"
+                )
+
+
+def timed_chat(chat, sink, model, messages, max_retries=0, queued_at=None, backoff_s=RETRY_BACKOFF_S, **labels):
+    """
+    Calls chat(model=..., messages=..., stream=False) and records its metrics in sink:
+    wall time, the server-reported token counts and durations, the number of retries
+    and the time spent waiting since queued_at (a time.perf_counter() timestamp taken
+    when the call was queued; None when it was not queued).
+    Retries wait backoff_s, 2 * backoff_s, 4 * backoff_s, ... before calling again.
+    Extra keyword arguments (row, level_us, iteration, ...) are stored as labels.
+
+    Returns:
+        The chat response. The last exception is re-raised once max_retries is exhausted.
+    """
+    start = time.perf_counter()
+    queue_wait = start - queued_at if queued_at is not None else 0.0
+    retries = 0
+    while True:
+        try:
+            response = chat(model=model, messages=messages, stream=False)
+            break
+        except Exception:
+            if retries >= max_retries:
+                sink.record(model=model, wall_s=time.perf_counter() - start, retries=retries,
+                            queue_wait_s=queue_wait, error=True, **labels)
+                raise
+            retries += 1
+            logging.warning(f"Chat call failed, retrying ({retries}/{max_retries})...")
+            time.sleep(backoff_s * 2 ** (retries - 1))
+
+    fields = {name: response.get(name) for name in SERVER_FIELDS}
+    sink.record(model=model, wall_s=time.perf_counter() - start, retries=retries,
+                queue_wait_s=queue_wait, error=False, **fields, **labels)
+    return response
@@ -0,0 +1,90 @@
+import hashlib
+import os
+
+import pandas as pd
+
+# Column added to every answers CSV so a later run can tell which rows are still valid
+FINGERPRINT_COLUMN = "Fingerprint"
+
+
+def prompt_hash(prompt_template: str) -> str:
+    """
+    Returns a short, stable hash of a prompt template (system instructions,
+    follow-up questions, ...). Any edit to the template changes the hash.
+    """
+    return hashlib.sha256(prompt_template.encode("utf-8")).hexdigest()[:16]
+
+
+def question_id(question: str) -> str:
+    """
+    Stable identifier of a question (or of one of its random variations): a short
+    hash of its text, shared by every run, model and prompt that answered it.
+    """
+    question = question if isinstance(question, str) else ""
+    return hashlib.sha256(question.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def row_fingerprint(question: str, prompt_digest: str, model: str, n_iterations: int, extra=()) -> str:
+    """
+    Fingerprints the inputs that determine the answer of a single row:
+    the question text, the prompt template hash, the model and the number of iterations,
+    plus the extra row values the solver depends on (e.g. the expected unit).
+    """
+    payload = "\x1f".join([question.strip(), *extra, prompt_digest, model, str(n_iterations)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def add_fingerprints(df: pd.DataFrame, prompt_template: str, model: str, n_iterations: int = 1,
+                     extra_columns=()) -> pd.DataFrame:
+    """
+    Adds (or refreshes) the Fingerprint column of a dataset DataFrame.
+    The values of extra_columns are fingerprinted along with the question.
+    """
+    digest = prompt_hash(prompt_template)
+    questions = df["Question"].fillna("").astype(str) if "Question" in df.columns else [""] * len(df)
+    extras = zip(*[df[column].fillna("").astype(str) if column in df.columns else [""] * len(df)
+                   for column in extra_columns]) if extra_columns else [()] * len(df)
+    df[FINGERPRINT_COLUMN] = [row_fingerprint(q, digest, model, n_iterations, extra)
+                              for q, extra in zip(questions, extras)]
+    return df
+
+
+def load_previous_results(output_csv_path: str) -> dict:
+    """
+    Loads the results store written by a previous run and indexes it by fingerprint.
+    Rows written before fingerprints existed (no Fingerprint column) cannot be matched
+    and are therefore ignored, which makes them stale on the next run.
+
+    Returns:
+        A dict mapping fingerprint -> row (as a dict of column -> value).
+    """
+    if not os.path.exists(output_csv_path):
+        return {}
+
+    df_previous = pd.read_csv(output_csv_path, sep=';', engine='python', dtype=str, keep_default_na=False)
+    if FINGERPRINT_COLUMN not in df_previous.columns:
+        return {}
+
+    previous = {}
+    for _, row in df_previous.iterrows():
+        fingerprint = row[FINGERPRINT_COLUMN]
+        if fingerprint:
+            previous[fingerprint] = row.to_dict()
+    return previous
+
+
+def merge_previous_results(df: pd.DataFrame, previous: dict, result_columns: list) -> list:
+    """
+    Copies the result columns of rows whose fingerprint is found in the previous results
+    store back into df, and returns the index labels of the rows that still need solving
+    (new rows, or rows whose question, prompt or model changed).
+    """
+    stale = []
+    for idx, fingerprint in df[FINGERPRINT_COLUMN].items():
+        previous_row = previous.get(fingerprint)
+        if previous_row is None:
+            stale.append(idx)
+            continue
+        for column in result_columns:
+            df.at[idx, column] = previous_row.get(column, "")
+    return stale
@@ -0,0 +1,277 @@
+import json
+import logging
+import os
+from collections import defaultdict
+
+import pandas as pd
+
+from run_manifest import question_id
+from scoring import score_csv
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional: runs are then cached as pickles
+    feather = None
+
+# Columns of the per-question table kept for every registered run
+TABLE_COLUMNS = [
+    "question_id", "run_id", "model", "strategy", "Level US", "Level FR",
+    "Correct", "Parsed value", "Parsed unit", "calls", "wall_s", "eval_count",
+]
+
+# Dimensions of the pre-aggregated cube, and the additive measures kept per cell
+CUBE_DIMENSIONS = ["run_id", "model", "strategy", "Level US"]
+CUBE_MEASURES = ["rows", "correct", "timed_rows", "calls", "wall_s", "eval_count"]
+
+REGISTRY_FILE = "registry.json"
+
+
+def _source_signature(*paths) -> list:
+    """
+    (path, size, mtime) of the files a run was built from, to detect changes.
+    """
+    return [[path, os.path.getsize(path), os.path.getmtime(path)] for path in paths if path and os.path.exists(path)]
+
+
+def load_call_totals(metrics_path: str) -> dict:
+    """
+    Sums the calls, wall time and generated tokens of each question in a metrics JSONL file.
+    The file is appended to by every run on the same output, so only the latest run
+    that answered a question is counted (run ids are timestamps).
+
+    Returns:
+        A dict question_id -> (calls, wall_s, eval_count).
+    """
+    latest = {}
+    totals = defaultdict(lambda: [0, 0.0, 0])
+    if not metrics_path or not os.path.exists(metrics_path):
+        return {}
+    with open(metrics_path, mode='r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    for record in records:
+        qid = record.get("question_id")
+        if qid and str(record.get("run_id")) > latest.get(qid, ""):
+            latest[qid] = str(record.get("run_id"))
+    for record in records:
+        qid = record.get("question_id")
+        if not qid or str(record.get("run_id")) != latest[qid]:
+            continue
+        totals[qid][0] += 1
+        totals[qid][1] += record.get("wall_s") or 0.0
+        totals[qid][2] += record.get("eval_count") or 0
+    return {qid: tuple(t) for qid, t in totals.items()}
+
+
+def build_run_table(answers_csv_path, run_id, model, strategy, metrics_path=None, reextract=True) -> pd.DataFrame:
+    """
+    Scores an answers CSV and joins its per-question latency from the metrics JSONL.
+    Snippets are re-extracted from the answers by default, so that runs solved with
+    different versions of the extractor are scored alike.
+    """
+    rows, _ = score_csv(answers_csv_path, reextract)
+    totals = load_call_totals(metrics_path)
+    records = []
+    for row in rows:
+        qid = question_id(row.get("Question") or "")
+        calls, wall_s, eval_count = totals.get(qid, (0, float("nan"), float("nan")))
+        records.append({
+            "question_id": qid,
+            "run_id": run_id,
+            "model": model,
+            "strategy": strategy,
+            "Level US": str(row.get("Level US", "")),
+            "Level FR": str(row.get("Level FR", "")),
+            "Correct": int(row["Correct"]),
+            "Parsed value": float("nan") if row["Parsed value"] == "" else float(row["Parsed value"]),
+            "Parsed unit": row["Parsed unit"],
+            "calls": calls,
+            "wall_s": wall_s,
+            "eval_count": eval_count,
+        })
+    return pd.DataFrame.from_records(records, columns=TABLE_COLUMNS)
+
+
+def build_cube(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates a run table to one row per (run_id, model, strategy, Level US), with
+    additive measures only, so that cubes of several runs can be rolled up by summing.
+    """
+    return (
+        table.assign(rows=1, correct=table["Correct"], timed_rows=(table["calls"] > 0).astype(int),
+                     wall_s=table["wall_s"].fillna(0.0), eval_count=table["eval_count"].fillna(0))
+        .groupby(CUBE_DIMENSIONS, as_index=False)[CUBE_MEASURES].sum()
+    )
+
+
+class RunStore:
+    """
+    A directory of registered runs, queried as one logical table.
+
+    Each run (an answers CSV, its metrics JSONL, a model and a prompt strategy) is scored
+    once at registration and cached as a per-question table plus a pre-aggregated cube,
+    in Arrow feather files read with memory mapping when pyarrow is installed, in pickles
+    otherwise; the format of each run is recorded in the registry. Queries only read the
+    caches, and keep them in memory for the session.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self.registry_path = os.path.join(store_dir, REGISTRY_FILE)
+        self.registry = {}
+        if os.path.exists(self.registry_path):
+            with open(self.registry_path, mode='r', encoding='utf-8') as f:
+                self.registry = json.load(f)
+        self._frames = {}
+
+    # -----------------------------------------------------------------
+    # Cache files
+    # -----------------------------------------------------------------
+    def _path(self, run_id, kind, cache_format):
+        return os.path.join(self.store_dir, f"{run_id}.{kind}.{cache_format}")
+
+    def _format(self, run_id):
+        entry = self.registry[run_id]
+        if "format" in entry:
+            return entry["format"]
+        # Runs registered before the format was recorded
+        return "feather" if os.path.exists(self._path(run_id, "table", "feather")) else "pkl"
+
+    def _write(self, df, run_id, kind, cache_format):
+        if cache_format == "feather":
+            feather.write_feather(df.reset_index(drop=True), self._path(run_id, kind, cache_format))
+        else:
+            df.to_pickle(self._path(run_id, kind, cache_format))
+
+    def _read(self, run_id, kind):
+        key = (run_id, kind)
+        if key not in self._frames:
+            cache_format = self._format(run_id)
+            path = self._path(run_id, kind, cache_format)
+            if cache_format == "feather":
+                if feather is None:
+                    raise ImportError(f"Run {run_id} is cached as feather files, which need pyarrow: "
+                                      f"install it or register the run again.")
+                self._frames[key] = feather.read_table(path, memory_map=True).to_pandas()
+            else:
+                self._frames[key] = pd.read_pickle(path)
+        return self._frames[key]
+
+    # -----------------------------------------------------------------
+    # Registration
+    # -----------------------------------------------------------------
+    def register(self, answers_csv_path, run_id=None, model=None, strategy=None, metrics_path=None,
+                 reextract=True):
+        """
+        Registers (or refreshes) a run. The run is only scored again when its answers CSV
+        or metrics JSONL changed since the last registration, or when it is registered
+        with other settings.
+
+        Args:
+            answers_csv_path: Answers CSV written by a solver.
+            run_id: Name of the run, by default the CSV file name.
+            model: Model of the run, by default the one found in the metrics.
+            strategy: Prompt strategy, by default "cot" for CoT answers and "simple" otherwise.
+            metrics_path: Metrics JSONL, by default "<answers>_metrics.jsonl".
+            reextract: Re-extract the snippets from the answers instead of scoring the
+                stored "Final Snippet" (see scoring.score_csv).
+
+        Returns:
+            The run id.
+        """
+        run_id = run_id or os.path.splitext(os.path.basename(answers_csv_path))[0]
+        metrics_path = metrics_path or os.path.splitext(answers_csv_path)[0] + "_metrics.jsonl"
+        signature = _source_signature(answers_csv_path, metrics_path)
+        entry = self.registry.get(run_id)
+        readable = entry and (feather is not None or self._format(run_id) != "feather")
+        if (readable and entry["sources"] == signature and model in (None, entry["model"])
+                and strategy in (None, entry["strategy"]) and entry.get("reextract") == reextract):
+            logging.info(f"Run {run_id} is up to date.")
+            return run_id
+
+        with open(answers_csv_path, mode='r', encoding='utf-8') as f:
+            header = f.readline()
+        strategy = strategy or ("cot" if "Answer_" in header else "simple")
+        model = model or self._model_from_metrics(metrics_path) or "unknown"
+
+        cache_format = "feather" if feather is not None else "pkl"
+        table = build_run_table(answers_csv_path, run_id, model, strategy, metrics_path, reextract)
+        self._write(table, run_id, "table", cache_format)
+        self._write(build_cube(table), run_id, "cube", cache_format)
+        self._frames.pop((run_id, "table"), None)
+        self._frames.pop((run_id, "cube"), None)
+
+        self.registry[run_id] = {
+            "answers": answers_csv_path,
+            "metrics": metrics_path,
+            "model": model,
+            "strategy": strategy,
+            "sources": signature,
+            "reextract": reextract,
+            "format": cache_format,
+        }
+        with open(self.registry_path, mode='w', encoding='utf-8') as f:
+            json.dump(self.registry, f, indent=2)
+        logging.info(f"Registered run {run_id} ({model}, {strategy}): {len(table)} questions.")
+        return run_id
+
+    @staticmethod
+    def _model_from_metrics(metrics_path):
+        if not metrics_path or not os.path.exists(metrics_path):
+            return None
+        with open(metrics_path, mode='r', encoding='utf-8') as f:
+            for line in f:
+                model = json.loads(line).get("model")
+                if model:
+                    return model
+        return None
+
+    # -----------------------------------------------------------------
+    # Queries
+    # -----------------------------------------------------------------
+    def runs(self) -> list:
+        return sorted(self.registry)
+
+    def table(self, run_ids=None) -> pd.DataFrame:
+        """
+        Per-question results of the given runs (all by default), indexed by (question_id, run_id).
+        """
+        run_ids = run_ids or self.runs()
+        frames = [self._read(run_id, "table") for run_id in run_ids]
+        if not frames:
+            return pd.DataFrame(columns=TABLE_COLUMNS).set_index(["question_id", "run_id"])
+        return pd.concat(frames, ignore_index=True).set_index(["question_id", "run_id"]).sort_index()
+
+    def cube(self, by=("model", "strategy", "Level US"), run_ids=None) -> pd.DataFrame:
+        """
+        Accuracy and latency rolled up from the pre-aggregated cubes along the given dimensions.
+
+        Returns:
+            A DataFrame indexed by the dimensions, with rows, accuracy, and the mean calls,
+            wall seconds and generated tokens per question (over the questions with metrics).
+        """
+        run_ids = run_ids or self.runs()
+        if not run_ids:
+            return pd.DataFrame()
+        cubes = pd.concat([self._read(run_id, "cube") for run_id in run_ids], ignore_index=True)
+        rolled = cubes.groupby(list(by))[CUBE_MEASURES].sum()
+        timed = rolled["timed_rows"].where(rolled["timed_rows"] > 0)
+        return pd.DataFrame({
+            "rows": rolled["rows"],
+            "accuracy": rolled["correct"] / rolled["rows"],
+            "calls_per_question": rolled["calls"] / timed,
+            "wall_s_per_question": rolled["wall_s"] / timed,
+            "tokens_per_question": rolled["eval_count"] / timed,
+        })
+
+    def compare(self, run_ids, column="Correct") -> pd.DataFrame:
+        """
+        One column per run for the questions shared by all of them, joined on question_id,
+        e.g. to list the questions the CoT run solves and the simple run does not.
+        """
+        values = self.table(run_ids)[column]
+        # A question asked twice in a dataset appears twice in a run: numbers are averaged,
+        # text (e.g. "Parsed unit") keeps the first answer
+        grouped = values.groupby(level=["question_id", "run_id"])
+        values = grouped.mean() if pd.api.types.is_numeric_dtype(values) else grouped.first()
+        return values.unstack("run_id")[list(run_ids)].dropna()
@@ -0,0 +1,172 @@
+import csv
+import heapq
+import json
+import logging
+import os
+from collections import defaultdict
+
+from run_manifest import question_id
+from toolbox_textParsing import allow_large_csv_fields
+
+allow_large_csv_fields()
+
+# Rough size of a token for the English + LaTeX answers of the dataset
+CHARS_PER_TOKEN = 4
+
+# Reading a prompt token is much cheaper than generating an answer token
+PROMPT_TOKEN_WEIGHT = 0.1
+
+# Position of the non-numeric "Level US" values on the grade scale
+LEVEL_RANKS = {
+    "Middle School": 7,
+    "High School": 10,
+    "Undergraduate": 14,
+    "Graduate": 17,
+    "Grad/Doc": 18,
+    "Doctorate": 19,
+}
+
+# Generated tokens expected without any history: about 200 at grade 7, 380 at doctorate level
+PRIOR_BASE_TOKENS = 100
+PRIOR_TOKENS_PER_RANK = 15
+
+STRATEGIES = ["dataset", "longest-first", "grouped"]
+
+
+def level_rank(level) -> int:
+    """
+    "9" -> 9, "Graduate" -> 17, anything else -> 12 (the middle of the scale).
+    """
+    level = str(level).strip()
+    if level in LEVEL_RANKS:
+        return LEVEL_RANKS[level]
+    try:
+        return int(float(level))
+    except ValueError:
+        return 12
+
+
+def _answer_length(row) -> int:
+    return sum(len(value or "") for name, value in row.items()
+               if name == "Full Answer" or (name or "").startswith("Answer_"))
+
+
+def load_token_history(metrics_paths=(), answers_paths=()):
+    """
+    Collects the generated tokens per question from earlier runs.
+    Metrics JSONL files (see call_metrics) give exact eval_count totals per row and run;
+    answers CSVs without metrics give an estimate from the answer length.
+
+    Returns:
+        (by_question, by_level): dicts question_id -> mean tokens and Level US -> mean tokens.
+    """
+    per_row = defaultdict(float)
+    levels = {}
+    for path in metrics_paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, mode='r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("error") or "question_id" not in record:
+                    continue
+                key = (record.get("run_id"), record["question_id"])
+                per_row[key] += record.get("eval_count") or 0
+                levels[record["question_id"]] = record.get("level_us", "")
+
+    tokens = defaultdict(list)
+    for (_, qid), count in per_row.items():
+        tokens[qid].append(count)
+
+    for path in answers_paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, mode='r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f, delimiter=';'):
+                qid = question_id(row.get("Question") or "")
+                length = _answer_length(row)
+                if qid in tokens or not length:
+                    continue
+                tokens[qid].append(length / CHARS_PER_TOKEN)
+                levels[qid] = row.get("Level US", "")
+
+    by_question = {qid: sum(counts) / len(counts) for qid, counts in tokens.items()}
+    by_level = defaultdict(list)
+    for qid, mean in by_question.items():
+        by_level[levels.get(qid, "")].append(mean)
+    return by_question, {level: sum(v) / len(v) for level, v in by_level.items()}
+
+
+def estimate_cost(question, level, by_question=None, by_level=None) -> float:
+    """
+    Expected cost of a row, in generated-token equivalents: the tokens generated for this
+    question in earlier runs, else the mean for its level, else a prior growing with the
+    level, plus the (cheaper) prompt tokens.
+    """
+    question = question if isinstance(question, str) else ""
+    level = str(level)
+    qid = question_id(question)
+    if by_question and qid in by_question:
+        generated = by_question[qid]
+    elif by_level and level in by_level:
+        generated = by_level[level]
+    else:
+        generated = PRIOR_BASE_TOKENS + PRIOR_TOKENS_PER_RANK * level_rank(level)
+    return generated + PROMPT_TOKEN_WEIGHT * len(question) / CHARS_PER_TOKEN
+
+
+def order_rows(costs, strategy="longest-first", n_groups=3):
+    """
+    Returns the positions of costs in the order they should be submitted.
+
+    strategies:
+        "dataset": unchanged order.
+        "longest-first": decreasing expected cost, so that long generations start early
+            and short ones fill the gaps at the end of the run.
+        "grouped": n_groups bins of similar expected length, longest bin first, dataset
+            order within a bin, so that concurrent requests finish at about the same time.
+    """
+    positions = list(range(len(costs)))
+    if strategy == "dataset":
+        return positions
+    if strategy == "longest-first":
+        return sorted(positions, key=lambda i: -costs[i])
+    if strategy == "grouped":
+        ranked = sorted(positions, key=lambda i: costs[i])
+        group = {i: rank * n_groups // max(1, len(costs)) for rank, i in enumerate(ranked)}
+        return sorted(positions, key=lambda i: -group[i])
+    raise ValueError(f"Unknown scheduling strategy: {strategy}")
+
+
+def simulate_makespan(costs, workers) -> float:
+    """
+    Finish time of the last row when rows are handed, in the given order,
+    to the first of workers free slots.
+    """
+    slots = [0.0] * max(1, workers)
+    for cost in costs:
+        heapq.heapreplace(slots, slots[0] + cost)
+    return max(slots)
+
+
+def compare_strategies(costs, workers):
+    """
+    Simulated makespan of every strategy for the given expected costs.
+
+    Returns:
+        A dict strategy -> (makespan, improvement over dataset order as a fraction).
+    """
+    baseline = simulate_makespan(costs, workers)
+    report = {}
+    for strategy in STRATEGIES:
+        makespan = simulate_makespan([costs[i] for i in order_rows(costs, strategy)], workers)
+        report[strategy] = (makespan, 1 - makespan / baseline if baseline else 0.0)
+    return report
+
+
+def log_schedule_report(costs, workers):
+    for strategy, (makespan, improvement) in compare_strategies(costs, workers).items():
+        logging.info(
+            f"Schedule {strategy} with {workers} worker(s): "
+            f"estimated makespan {makespan:.0f} tokens ({improvement:.1%} shorter than in dataset order)"
+        )
@@ -0,0 +1,88 @@
+import csv
+from collections import defaultdict
+
+from answer_extraction import clean_snippet, extract_answer, split_value_unit
+from toolbox_textParsing import allow_large_csv_fields
+
+allow_large_csv_fields()
+
+REL_TOLERANCE = 0.02  # A value within 2% of the expected numeric answer is correct
+
+
+def is_close(value, expected, rel_tolerance=REL_TOLERANCE):
+    if value is None or expected is None:
+        return False
+    if expected == 0:
+        return abs(value) <= rel_tolerance
+    return abs(value - expected) <= rel_tolerance * abs(expected)
+
+
+def answer_columns(fieldnames) -> list:
+    """
+    Returns the columns holding the model answers of a run, in order:
+    "Full Answer" for the simple solver, "Answer_1", "Answer_2", ... for the CoT solver.
+    """
+    fieldnames = fieldnames or []  # None for an empty file
+    if "Full Answer" in fieldnames:
+        return ["Full Answer"]
+    columns = [name for name in fieldnames if name.startswith("Answer_")]
+    return sorted(columns, key=lambda name: int(name.split("_", 1)[1]))
+
+
+def last_answer(row, columns) -> str:
+    """
+    The last non-empty answer of a row: a CoT row can stop before the last iteration.
+    """
+    for name in reversed(columns):
+        if row.get(name):
+            return row[name]
+    return ""
+
+
+def score_row(row, columns=None, rel_tolerance=REL_TOLERANCE):
+    """
+    Scores one row of an answers CSV. The snippet is taken from "Final Snippet",
+    or re-extracted from the last non-empty of the answer columns when given.
+
+    Returns:
+        (correct, value, unit) where value/unit are parsed from the snippet.
+    """
+    if columns:
+        snippet = extract_answer(last_answer(row, columns))
+    else:
+        snippet = clean_snippet(row.get("Final Snippet", ""))
+    value, unit = split_value_unit(snippet)
+    expected, _ = split_value_unit(row.get("Numeric answer", ""))
+    return is_close(value, expected, rel_tolerance), value, unit
+
+
+def score_csv(csv_path, reextract=False, rel_tolerance=REL_TOLERANCE, group_by="Level US"):
+    """
+    Scores an answers CSV (';'-separated) against its "Numeric answer" column.
+
+    Args:
+        csv_path: Path to the answers CSV written by a solver.
+        reextract: Re-extract the snippet from the last answer of each row instead of
+            trusting the stored "Final Snippet".
+        rel_tolerance: Relative tolerance on the numeric value.
+        group_by: Column the accuracy is broken down by.
+
+    Returns:
+        A tuple (rows, summary): the rows with added "Parsed value", "Parsed unit"
+        and "Correct" fields, and a dict group -> (correct, total) including "all".
+    """
+    rows = []
+    summary = defaultdict(lambda: [0, 0])
+    with open(csv_path, mode='r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f, delimiter=';')
+        columns = answer_columns(reader.fieldnames) if reextract else None
+        for row in reader:
+            correct, value, unit = score_row(row, columns, rel_tolerance)
+            row["Parsed value"] = "" if value is None else value
+            row["Parsed unit"] = unit
+            row["Correct"] = int(correct)
+            rows.append(row)
+            for key in ("all", row.get(group_by, "")):
+                summary[key][0] += int(correct)
+                summary[key][1] += 1
+    return rows, {key: tuple(counts) for key, counts in summary.items()}
@@ -1,12 +1,30 @@
-import re
+import csv
+import sys
 
-def extract_final_bit(answer: str):
+from answer_extraction import extract_answer
+
+
+def allow_large_csv_fields():
+    """
+    Raises the csv module field size limit, which model answers can exceed.
+    sys.maxsize overflows the C long of some platforms (e.g. 64-bit Windows),
+    so the limit is lowered until it is accepted.
+    """
+    limit = sys.maxsize
+    while True:
+        try:
+            csv.field_size_limit(limit)
+            return limit
+        except OverflowError:
+            limit //= 2
+
+
+def extract_final_bit(answer: str, which: str = "last"):
     """
-    Utility function to extract the text between <A> and <\A>.
-    Returns the content inside <A> ... <\A>, or an empty string if not found.
+    Utility function to extract the text between <A> and <\\A>.
+    Tag variants (</A>, <ANSWER>, unclosed <A>) are accepted, the last block is kept
+    by default (which="first" keeps the first one), and a bare trailing number + unit
+    is recovered when the tags are missing.
+    Returns an empty string if nothing usable is found.
     """
-    pattern = r"<A>(.*?)<\\A>"
-    match = re.search(pattern, answer, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    return ""
\ No newline at end of file
+    return extract_answer(answer, which)
@@ -0,0 +1,226 @@
+import os
+import re
+import sys
+# ---------------------------------------------------------------------
+# Unit tables shared with the exercise generator
+# ---------------------------------------------------------------------
+make_exercises_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "make_exercises")
+
+# Add the folder to sys.path if it's not already included
+if make_exercises_path not in sys.path:
+    sys.path.append(make_exercises_path)
+
+from randomize_questions import DIMENSIONAL_EQUIVALENCES
+
+# Dimension of every non-derived unit, as a product of SI base units (or of a
+# pseudo base unit for data sizes and currencies). Derived units (N, J, W, ...)
+# come from DIMENSIONAL_EQUIVALENCES.
+BASE_DIMENSIONS = {
+    # length
+    "m": "m", "in": "m", "ft": "m", "yd": "m", "mi": "m", "ly": "m", "AU": "m", "parsec": "m", "pc": "m",
+    "mile": "m", "miles": "m", "meter": "m", "meters": "m", "metre": "m", "metres": "m",
+    "kilometer": "m", "kilometers": "m", "light-year": "m", "light-years": "m",
+    # time
+    "s": "s", "min": "s", "h": "s", "hr": "s", "day": "s", "yr": "s", "Myr": "s",
+    "second": "s", "seconds": "s", "minute": "s", "minutes": "s", "hour": "s", "hours": "s",
+    "days": "s", "year": "s", "years": "s",
+    # mass
+    "g": "kg", "lb": "kg", "oz": "kg", "earth_mass": "kg", "solar_mass": "kg", "Msun": "kg",
+    "gram": "kg", "grams": "kg", "kilogram": "kg", "kilograms": "kg",
+    # current, temperature, amount of substance
+    "A": "A", "K": "K", "°C": "K", "°F": "K", "mol": "mol",
+    # other non-SI units
+    "mph": "m * s^-1", "kn": "m * s^-1",
+    "eV": "kg * m^2 * s^-2", "cal": "kg * m^2 * s^-2",
+    "bar": "kg * m^-1 * s^-2", "atm": "kg * m^-1 * s^-2",
+    "Hz": "s^-1", "L": "m^3",
+    # pseudo base units
+    "B": "B", "bit": "B", "byte": "B", "bytes": "B",
+    "USD": "USD", "$": "USD", "EUR": "USD", "€": "USD", "dollars": "USD",
+    # dimensionless
+    "rad": "", "radian": "", "radians": "", "sr": "", "%": "", "percent": "",
+}
+
+# SI prefixes accepted in front of any unit above or of DIMENSIONAL_EQUIVALENCES ("km", "mg", "kPa", "TeV", "MB", ...)
+PREFIXES = "yzafpnuμmcdhkMGTPEZY"
+
+# Symbols with two common readings: "C" is the Coulomb of DIMENSIONAL_EQUIVALENCES,
+# but the dataset also uses it for degrees Celsius.
+AMBIGUOUS_UNITS = {"C": "°C"}
+
+_TOKEN = re.compile(r"\(|\)|/|\*|\^\s*\{?\s*([-−]?\d+)\s*\}?|[²³]|[^\s()/*^²³]+")
+
+
+class UnknownUnit(ValueError):
+    pass
+
+
+def _lookup(symbol: str) -> str:
+    if symbol in BASE_DIMENSIONS:
+        return BASE_DIMENSIONS[symbol]
+    if symbol in DIMENSIONAL_EQUIVALENCES:
+        return DIMENSIONAL_EQUIVALENCES[symbol]
+    if len(symbol) > 1 and symbol[0] in PREFIXES:
+        rest = symbol[1:]
+        if rest in BASE_DIMENSIONS:
+            return BASE_DIMENSIONS[rest]
+        if rest in DIMENSIONAL_EQUIVALENCES:
+            return DIMENSIONAL_EQUIVALENCES[rest]
+    raise UnknownUnit(symbol)
+
+
+def _multiply(a: dict, b: dict, power: int = 1) -> dict:
+    result = dict(a)
+    for base, exponent in b.items():
+        result[base] = result.get(base, 0) + exponent * power
+        if result[base] == 0:
+            del result[base]
+    return result
+
+
+def _normalize(unit: str) -> str:
+    # "m**2": Python power
+    unit = unit.replace("**", "^")
+    unit = unit.replace("\\cdot", "*").replace("·", "*").replace("⋅", "*").replace("×", "*")
+    unit = re.sub(r"\^?\s*\{?\s*\\(?:circ|degree)\s*\}?\s*", "°", unit)
+    unit = unit.replace("\\mathrm", "").replace("{", " ").replace("}", " ").replace("\\", "")
+    unit = re.sub(r"\s+per\s+", "/", unit)
+    # "kg.m^3": a dot between two letters is a product
+    unit = re.sub(r"(?<=[A-Za-z])\.(?=[A-Za-z])", "*", unit)
+    return unit.strip(" \t.,;:[]")
+
+
+def parse_dimension(unit: str) -> dict:
+    """
+    Parses a unit string such as "m/s^2", "J/(kg*K)", "kg.m^3", "W/m²" or "radians per second"
+    into its dimension, a dict base unit -> exponent (e.g. {"m": 1, "s": -2}).
+    The empty string is dimensionless.
+
+    Raises:
+        UnknownUnit: if a symbol of the unit is not known, or its parentheses do not match.
+    """
+    tokens = [(m.group(0), m.group(1)) for m in _TOKEN.finditer(_normalize(unit))]
+    position = 0
+
+    def exponent():
+        nonlocal position
+        if position < len(tokens):
+            token, power = tokens[position]
+            if power is not None:
+                position += 1
+                return int(power.replace("−", "-"))
+            if token in ("²", "³"):
+                position += 1
+                return 2 if token == "²" else 3
+        return 1
+
+    def factor():
+        nonlocal position
+        token, _ = tokens[position]
+        position += 1
+        if token == "(":
+            dims = product()
+            if position < len(tokens) and tokens[position][0] == ")":
+                position += 1
+        elif token in (")", "*", "/") or token.startswith("^"):
+            raise UnknownUnit(unit)
+        elif re.fullmatch(r"[\d.]+", token):
+            # "1/s" or a stray number: dimensionless
+            dims = {}
+        else:
+            dims = product_of_string(_lookup(token))
+        power = exponent()
+        return {base: e * power for base, e in dims.items()}
+
+    def product():
+        nonlocal position
+        dims = {}
+        sign = 1
+        while position < len(tokens) and tokens[position][0] != ")":
+            token = tokens[position][0]
+            if token == "*":
+                position += 1
+                continue
+            if token == "/":
+                position += 1
+                sign = -1
+                continue
+            dims = _multiply(dims, factor(), sign)
+            # "/" applies to the next factor only: m/s^2 = m * s^-2
+            sign = 1
+        return dims
+
+    dims = product()
+    if position < len(tokens):
+        # Only an unbalanced ")" stops the top-level product early
+        raise UnknownUnit(unit)
+    return dims
+
+
+def product_of_string(dimension: str) -> dict:
+    """
+    Parses a dimension written as in DIMENSIONAL_EQUIVALENCES ("kg * m^2 * s^-2").
+    """
+    dims = {}
+    for part in dimension.split("*"):
+        part = part.strip()
+        if not part:
+            continue
+        base, _, power = part.partition("^")
+        dims = _multiply(dims, {base.strip(): int(power) if power else 1})
+    return dims
+
+
+def format_dimension(dims: dict) -> str:
+    """
+    {"kg": 1, "m": 2, "s": -2} -> "kg * m^2 * s^-2", {} -> "dimensionless".
+    """
+    if not dims:
+        return "dimensionless"
+    return " * ".join(base if e == 1 else f"{base}^{e}" for base, e in sorted(dims.items()))
+
+
+def _dimensions(unit: str) -> list:
+    """
+    Dimensions of every reading of a unit (see AMBIGUOUS_UNITS) that can be parsed.
+    """
+    unit = _normalize(unit)
+    readings = [unit]
+    for symbol, alternative in AMBIGUOUS_UNITS.items():
+        pattern = r"(?<![\w°])" + re.escape(symbol) + r"(?!\w)"
+        if re.search(pattern, unit):
+            readings.append(re.sub(pattern, alternative, unit))
+    dimensions = []
+    for reading in readings:
+        try:
+            dimensions.append(parse_dimension(reading))
+        except UnknownUnit:
+            continue
+    return dimensions
+
+
+def check_dimension(unit: str, expected_unit: str):
+    """
+    Checks that unit has the same dimension as expected_unit.
+
+    Returns:
+        (consistent, message). consistent is None when either unit cannot be
+        parsed, in which case nothing can be concluded. message names the
+        inconsistency when consistent is False.
+    """
+    expected = _dimensions(expected_unit)
+    found = _dimensions(unit)
+    if not expected or not found:
+        return None, ""
+    if any(f == e for f in found for e in expected):
+        return True, ""
+    if not unit.strip():
+        return False, (
+            f"no unit is given, but the question asks for a quantity of dimension "
+            f"{format_dimension(expected[0])} (for example '{expected_unit}')"
+        )
+    return False, (
+        f"the unit '{unit}' has dimension {format_dimension(found[0])}, "
+        f"but the question asks for a quantity of dimension {format_dimension(expected[0])} "
+        f"(for example '{expected_unit}')"
+    )
@@ -396,7 +396,7 @@ def generate_random_variation(row):
 
     return new_row
 
-def main(input_csv_path, output_csv_path):
+def main(input_csv_path, output_csv_path, n_variations=3):
     # read all rows
     rows = []
     with open(input_csv_path, "r", encoding="utf-8") as f:
@@ -408,7 +408,7 @@ def main(input_csv_path, output_csv_path):
     variations = []
     for r in rows:
         # e.g. generate N variations per row
-        for _ in range(3):
+        for _ in range(n_variations):
             new_r = generate_random_variation(r)
             variations.append(new_r)
 
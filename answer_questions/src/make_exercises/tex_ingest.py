@@ -0,0 +1,263 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import logging
+
+# Columns of the exercises dataset (';'-separated), as in DATA/DatasetPython5.csv
+FIELDNAMES = [
+    'Level US',
+    'Level FR',
+    'Question',
+    'Variables',
+    'Variables (no units)',
+    'Formula',
+    'Test Answer',
+    'Numeric answer',
+    'Units 1',
+    'Solve function'
+]
+
+# Columns that cannot be derived from the TeX source and are kept from the existing dataset
+CURATED_FIELDS = ['Level US', 'Level FR', 'Formula', 'Solve function']
+
+# Columns parsed from the TeX source that the curated dataset adapts to its solve function
+# (times converted to seconds, variables added from the solution): for questions already in
+# the dataset the curated values are kept, the parsed ones only fill new or empty rows
+SOLVE_FIELDS = ['Variables', 'Variables (no units)', 'Numeric answer', 'Units 1']
+
+# Bump when parse_section changes, so that cached sections are parsed again
+PARSER_VERSION = 3
+
+# Export artifacts found in the corpus: "\a" and "\f" turned into control characters,
+# sometimes serialized as "_x0007_" (e.g. "_x0007_\approx", "a\approximately").
+_ARTIFACTS = [
+    (re.compile(r"_x00[0-9A-Fa-f]{2}_"), ""),
+    (re.compile(r"\b[aA]\\approximately"), "approximately"),
+    (re.compile(r"[\x00-\x08\x0b-\x1f]"), ""),
+]
+
+# A number as written in the corpus: "10", "1.5", "6.626 \cdot 10^{-34}", "3.828 \times 10^{26}", "10^{-8}",
+# "10{,}000", "108,000"
+_NUMBER = r"-?\d[\d.]*(?:(?:\{,\}|,)\d{3}(?!\d))*(?:\s*(?:\\cdot|\\times)\s*10\^\{?-?\d+\}?|\^\{?-?\d+\}?)?"
+
+# "\mathrm{m/s}", "\mathrm{m^3 \cdot kg^{-1} \cdot s^{-2}}": one level of nested braces
+_UNIT = r"\\mathrm\{(?P<unit>(?:[^{}]|\{[^{}]*\})*)\}"
+
+# "\( v_0 = 10 \, \mathrm{m/s} \)", "\( n = 1 \)"
+_BINDING = re.compile(
+    r"\\\(\s*(?P<name>\\?[A-Za-z][\w\\{}]*)\s*=\s*(?P<value>" + _NUMBER + r")"
+    r"\s*(?:\\,\s*" + _UNIT + r")?\s*\\\)"
+)
+
+# "75 \, \mathrm{m}" anywhere in a solution
+_VALUE_UNIT = re.compile(r"(?P<value>" + _NUMBER + r")\s*\\,\s*" + _UNIT)
+
+_POWER = re.compile(r"(?P<mantissa>-?[\d.]+)\s*(?:\\cdot|\\times)\s*10\^\{?(?P<exponent>-?\d+)\}?")
+_BARE_POWER = re.compile(r"(?P<base>-?[\d.]+)\^\{?(?P<exponent>-?\d+)\}?")
+
+
+def clean_tex(text: str) -> str:
+    for pattern, replacement in _ARTIFACTS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(f"{PARSER_VERSION}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+def iter_tex_sections(tex_path: str):
+    """
+    Streams the \\section{} blocks of a TeX file, without loading the whole file.
+    Yields the raw text of each section (without the \\section line).
+    """
+    lines = None
+    with open(tex_path, mode='r', encoding='utf-8') as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.startswith("\\section"):
+                if lines is not None:
+                    yield "".join(lines)
+                lines = []
+            elif stripped.startswith("\\end{document}"):
+                break
+            elif lines is not None:
+                lines.append(line)
+    if lines is not None:
+        yield "".join(lines)
+
+
+def split_question_solution(section: str):
+    """
+    The question is the first paragraph of a section, the worked solution is the rest.
+    """
+    paragraphs = [" ".join(p.split()) for p in re.split(r"\n\s*\n", section.strip()) if p.strip()]
+    if not paragraphs:
+        return "", ""
+    return paragraphs[0], " ".join(paragraphs[1:])
+
+
+def parse_number(value_str: str):
+    """
+    Converts a TeX number into (float, plain text), e.g.
+    "6.626 \\cdot 10^{-34}" -> (6.626e-34, "6.626e-34"), "10^{-8}" -> (1e-08, "1e-8"),
+    "10{,}000" -> (10000.0, "10000").
+    """
+    value_str = value_str.replace("{,}", "").replace(",", "")
+    power = _POWER.fullmatch(value_str.strip())
+    bare_power = _BARE_POWER.fullmatch(value_str.strip())
+    if power:
+        text = f"{power.group('mantissa')}e{int(power.group('exponent'))}"
+    elif bare_power and bare_power.group("base") == "10":
+        text = f"1e{int(bare_power.group('exponent'))}"
+    elif bare_power:
+        text = repr(float(bare_power.group("base")) ** int(bare_power.group("exponent")))
+    else:
+        text = value_str.strip()
+    try:
+        return float(text), text
+    except ValueError:
+        return None, text
+
+
+def normalize_unit(unit: str) -> str:
+    """
+    "J \\cdot s" -> "J*s", "m/s^2" -> "m/s^2", "kg^{-1}" -> "kg^-1".
+    """
+    unit = unit.replace("\\cdot", "*").replace("{", "").replace("}", "")
+    return re.sub(r"\s*\*\s*", "*", " ".join(unit.split()))
+
+
+def normalize_name(name: str) -> str:
+    """
+    Variable names as used in the dataset: "v_0" -> "v0", "P_{1}" -> "P1", "T_H" -> "TH",
+    "\\lambda" -> "lambda", "m_e" -> "m_e".
+    """
+    name = name.replace("\\", "").replace("{", "").replace("}", "")
+    return re.sub(r"_(\d+|[A-Z])(?![A-Za-z])", r"\1", name)
+
+
+def extract_bindings(question: str):
+    """
+    Extracts the "\\( var = value \\, \\mathrm{unit} \\)" bindings of a question.
+
+    Returns:
+        A list of (name, value text, float value, unit) tuples, in order of appearance.
+    """
+    bindings = []
+    for match in _BINDING.finditer(question):
+        value, text = parse_number(match.group("value"))
+        if value is None:
+            continue
+        bindings.append((normalize_name(match.group("name")), text, value, normalize_unit(match.group("unit") or "")))
+    return bindings
+
+
+def extract_final_answer(solution: str):
+    """
+    Returns the (value text, unit) of the last "value \\, \\mathrm{unit}" of a solution,
+    or ("", "") if none is found.
+    """
+    last = None
+    for match in _VALUE_UNIT.finditer(solution):
+        last = match
+    if last is None:
+        return "", ""
+    _, text = parse_number(last.group("value"))
+    return text, normalize_unit(last.group("unit"))
+
+
+def parse_section(section: str) -> dict:
+    """
+    Turns one \\section{} block into a dataset row (without the curated columns).
+    """
+    question, solution = split_question_solution(clean_tex(section))
+    bindings = extract_bindings(question)
+    numeric_answer, unit = extract_final_answer(solution)
+    return {
+        'Question': question,
+        'Variables': ", ".join(f"{name}={text} {unit}".strip() for name, text, _, unit in bindings),
+        'Variables (no units)': ", ".join(f"{name}:{text}" for name, text, _, _ in bindings),
+        'Test Answer': solution,
+        'Numeric answer': numeric_answer,
+        'Units 1': unit,
+    }
+
+
+def load_dataset(csv_path: str):
+    if not os.path.exists(csv_path):
+        return []
+    with open(csv_path, mode='r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f, delimiter=';'))
+
+
+def main(tex_path, output_csv_path, dataset_csv_path=None, cache_path=None):
+    """
+    Writes a dataset CSV synchronized with the TeX corpus.
+    Sections whose content hash is in the cache are not parsed again; the curated
+    columns (levels, formula, solve function) of the existing dataset (dataset_csv_path,
+    by default the output itself) are kept for questions whose text did not change,
+    with the variables and answer the solve function expects, and its other columns
+    wherever the parser finds nothing.
+
+    Returns:
+        (number of sections parsed, number of sections reused from the cache)
+    """
+    cache_path = cache_path or os.path.splitext(output_csv_path)[0] + ".tex-cache.json"
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, mode='r', encoding='utf-8') as f:
+            cache = json.load(f)
+
+    dataset_csv_path = dataset_csv_path or output_csv_path
+    curated = {clean_tex(row.get('Question', '')).strip(): row for row in load_dataset(dataset_csv_path)}
+
+    rows = []
+    new_cache = {}
+    parsed = reused = 0
+    for section in iter_tex_sections(tex_path):
+        key = content_hash(section)
+        if key in cache:
+            parsed_row = cache[key]
+            reused += 1
+        else:
+            parsed_row = parse_section(section)
+            parsed += 1
+        new_cache[key] = parsed_row
+
+        row = {name: "" for name in FIELDNAMES}
+        previous = curated.get(parsed_row['Question'], {})
+        for name in CURATED_FIELDS:
+            row[name] = previous.get(name, "")
+        for name, value in parsed_row.items():
+            if name in SOLVE_FIELDS and previous.get(name):
+                value = previous[name]
+            row[name] = value or previous.get(name, "")
+        rows.append(row)
+
+    with open(output_csv_path, mode='w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES, delimiter=';')
+        writer.writeheader()
+        writer.writerows(rows)
+
+    # Only the hashes of the current sections are kept, so the cache does not grow with edits
+    with open(cache_path, mode='w', encoding='utf-8') as f:
+        json.dump(new_cache, f)
+
+    logging.info(f"{len(rows)} sections written to {output_csv_path}: {parsed} parsed, {reused} unchanged.")
+    return parsed, reused
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python tex_ingest.py <questions.tex> <output_csv> [<curated_dataset_csv>]")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    tex_path = sys.argv[1]
+    output_csv = sys.argv[2]
+    dataset_csv = sys.argv[3] if len(sys.argv) > 3 else None
+    main(tex_path, output_csv, dataset_csv)
@@ -1,8 +1,23 @@
 import pandas as pd
 import re
+import os
+import sys
 from ollama import chat  # or from ollama import Ollama if you prefer an OO approach
 import logging
-import os
+# ---------------------------------------------------------------------
+# Custom libraries
+# ---------------------------------------------------------------------
+library_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "libraries")
+
+# Add the folder to sys.path if it's not already included
+if library_path not in sys.path:
+    sys.path.append(library_path)
+
+from toolbox_textParsing import extract_final_bit
+from answer_extraction import unit_text
+from unit_dimensions import check_dimension
+from call_metrics import MetricsSink, timed_chat
+from run_manifest import FINGERPRINT_COLUMN, add_fingerprints, load_previous_results, merge_previous_results, question_id
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -11,40 +26,18 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 
 # Parameters
-input_csv_path = '/Users/vincentclerc/Documents/Stanford/DCRP-StanfordMath/answer_questions/DATA/DatasetPython5.csv'
-output_csv_path = '/Users/vincentclerc/Documents/Stanford/DCRP-StanfordMath/answer_questions/DATA/DatasetPython5_answers-COT.csv'
+data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "DATA")
+input_csv_path = os.path.join(data_path, "DatasetPython5.csv")
+output_csv_path = os.path.join(data_path, "DatasetPython5_answers-COT.csv")
+
+MODEL = "llama3.1:latest"
+MAX_RETRIES = 2  # Retries of a failed chat call before giving up on the row
 
 # Chain of Thought Parameters
-N_ITERATIONS = 3  # Number of CoT iterations
+N_ITERATIONS = 3  # Maximum number of turns per question: the answer, then follow-ups on unit inconsistencies
 SAVE_EVERY = 100  # Save results every 100 questions
 
-# Log start of processing
-logging.info(f"Starting the process. Reading input CSV from: {input_csv_path}")
-
-# 1) Read the CSV
-df = pd.read_csv(input_csv_path, sep=';', engine='python')
-logging.info(f"Input CSV loaded successfully. Total rows: {len(df)}")
-
-# 2) Prepare columns to store results
-for i in range(1, N_ITERATIONS + 1):
-    df[f"Question_{i}"] = ""
-    df[f"Answer_{i}"] = ""
-df["Final Snippet"] = ""
-
-# 3) Check if output CSV exists to resume processing
-if os.path.exists(output_csv_path):
-    logging.info(f"Output CSV found at {output_csv_path}. Loading existing data to resume.")
-    df_existing = pd.read_csv(output_csv_path, sep=';', engine='python')
-    start_idx = len(df_existing)
-    if start_idx >= len(df):
-        logging.info("All questions have already been processed.")
-        exit()
-    df = df.iloc[start_idx:]
-    logging.info(f"Resuming from row {start_idx + 1}.")
-else:
-    logging.info("No existing output CSV found. Starting fresh.")
-
-# 4) Define System Instructions
+# System Instructions
 system_instructions = """You are a helpful physics assistant. 
 You will be given a question with numeric variables. 
 Provide a thorough, step-by-step solution, but ensure that, at the very end, 
@@ -52,74 +45,145 @@ you produce the final numeric result in the format:
 
 <A> [numeric result] [units] <\\A>
 """
+# Follow-up sent only when the unit of the final answer is dimensionally inconsistent
+dimension_follow_up = """Your final answer <A> {snippet} <\\A> is not dimensionally consistent: {inconsistency}.
+Please check the dimensions of every step of your solution, correct it, and give the final numeric result in the format:
 
-# 5) Process each question in the CSV
-full_answers = []
-final_snippets = []
-
-for idx, row in df.iterrows():
-    global_idx = idx  # Adjust if resuming
-    logging.info(f"Processing row {global_idx + 1}/{len(df)}...")
-
-    # Extract relevant columns
-    question = row["Question"] if "Question" in df.columns else ""
-    logging.debug(f"Question: {question}")
-
-    # Initialize messages with system instructions and initial question
-    messages = [
-        {"role": "system", "content": system_instructions},
-        {"role": "user", "content": question}
-    ]
-
-    # Store the initial question
-    df.at[idx, "Question_1"] = question
-
-    # Initialize variable to hold the latest answer
-    latest_answer = ""
-
-    try:
-        for i in range(1, N_ITERATIONS + 1):
-            logging.info(f"Sending Question_{i} to Llama API...")
-            response = chat(model="llama3.1:latest", messages=messages, stream=False)
-
-            # Extract the answer
-            answer = response["message"]["content"]
-            logging.debug(f"Response received: {answer}")
+<A> [numeric result] [units] <\\A>
+"""
+# Follow-up sent when no final answer can be found, so there is no unit to check
+format_follow_up = """Your answer does not end with the final numeric result in the required format.
+Please give the final numeric result of your solution in the format:
 
-            # Store the answer
-            df.at[idx, f"Answer_{i}"] = answer
+<A> [numeric result] [units] <\\A>
+"""
 
-            # Extract the final bit
-            final_bit = extract_final_bit(answer)
-            logging.info(f"Extracted final bit from Answer_{i}: {final_bit}")
 
-            if i == N_ITERATIONS:
+def main(input_csv_path, output_csv_path, model=MODEL, n_iterations=N_ITERATIONS):
+    # Log start of processing
+    logging.info(f"Starting the process. Reading input CSV from: {input_csv_path}")
+
+    # 1) Read the CSV
+    df = pd.read_csv(input_csv_path, sep=';', engine='python')
+    logging.info(f"Input CSV loaded successfully. Total rows: {len(df)}")
+
+    # 2) Prepare columns to store results
+    result_columns = []
+    for i in range(1, n_iterations + 1):
+        result_columns += [f"Question_{i}", f"Answer_{i}"]
+    result_columns += ["Final Snippet", "Dimension Check"]
+    for column in result_columns:
+        df[column] = ""
+
+    # 3) Reuse the rows of the existing output CSV whose question, prompt and model did not change.
+    #    This also resumes an interrupted run, since only finished rows are ever saved.
+    #    The expected unit decides which follow-ups are sent, so it is part of the fingerprint.
+    add_fingerprints(df, system_instructions + dimension_follow_up + format_follow_up, model, n_iterations,
+                     extra_columns=["Units 1"])
+    if os.path.exists(output_csv_path):
+        logging.info(f"Output CSV found at {output_csv_path}. Loading existing data to resume.")
+    else:
+        logging.info("No existing output CSV found. Starting fresh.")
+    previous = load_previous_results(output_csv_path)
+    stale_rows = merge_previous_results(df, previous, result_columns)
+    if not stale_rows:
+        logging.info("All questions have already been processed.")
+        return
+    logging.info(f"{len(df) - len(stale_rows)} rows up to date, {len(stale_rows)} rows to solve.")
+
+    # Per-call metrics are appended next to the output CSV
+    metrics_path = os.path.splitext(output_csv_path)[0] + "_metrics.jsonl"
+    metrics = MetricsSink(metrics_path)
+    stale = set(stale_rows)
+    done = [idx for idx in df.index if idx not in stale]
+
+    # 4) Process each new or stale question in the CSV
+    for n, idx in enumerate(stale_rows, start=1):
+        row = df.loc[idx]
+        logging.info(f"Processing row {idx + 1}/{len(df)} ({n}/{len(stale_rows)} stale)...")
+
+        # Extract relevant columns
+        question = row["Question"] if "Question" in df.columns else ""
+        logging.debug(f"Question: {question}")
+
+        # Initialize messages with system instructions and initial question
+        messages = [
+            {"role": "system", "content": system_instructions},
+            {"role": "user", "content": question}
+        ]
+
+        # Store the initial question
+        df.at[idx, "Question_1"] = question
+        expected_unit = row["Units 1"] if isinstance(row.get("Units 1"), str) else ""
+
+        i = 1
+        try:
+            for i in range(1, n_iterations + 1):
+                logging.info(f"Sending Question_{i} to Llama API...")
+                # Rows are solved one at a time, so there is no queue wait to record
+                response = timed_chat(chat, metrics, model, messages, max_retries=MAX_RETRIES,
+                                      row=int(idx), question_id=question_id(question),
+                                      level_us=str(row.get("Level US", "")), iteration=i)
+
+                # Extract the answer
+                answer = response["message"]["content"]
+                logging.debug(f"Response received: {answer}")
+
+                # Store the answer
+                df.at[idx, f"Answer_{i}"] = answer
+
+                # Extract the final bit and check its unit against the expected one
+                final_bit = extract_final_bit(answer)
                 df.at[idx, "Final Snippet"] = final_bit
-
-            latest_answer = answer  # Update the latest answer
-
-            # Prepare the next question if not the last iteration
-            if i < N_ITERATIONS:
-                follow_up_question = "Could you verify this answer?"
-                df.at[idx, f"Question_{i + 1}"] = follow_up_question
-                messages.append({"role": "user", "content": follow_up_question})
-
-    except Exception as e:
-        logging.error(f"An error occurred while processing row {global_idx + 1}: {e}")
-        # Optionally, fill remaining answers/questions with NaN or a placeholder
-        for j in range(i + 1, N_ITERATIONS + 1):
-            df.at[idx, f"Question_{j}"] = "Error: Unable to process."
-            df.at[idx, f"Answer_{j}"] = "Error: Unable to process."
-        df.at[idx, "Final Snippet"] = "Error: Unable to extract."
-        continue
-
-    # Save progress every SAVE_EVERY questions
-    if (global_idx + 1) % SAVE_EVERY == 0:
-        logging.info(f"Saving progress at row {global_idx + 1}/{len(df)}.")
-        df.iloc[:global_idx + 1].to_csv(output_csv_path, index=False, sep=';')
-        logging.info(f"Progress saved to {output_csv_path}.")
-
-# 6) Save the final results
-logging.info("All questions processed. Saving final results.")
-df.to_csv(output_csv_path, index=False, sep=';')
-logging.info(f"Final results saved to: {output_csv_path}")
+                if not final_bit:
+                    # Without a final answer there is no unit to check: ask for the answer itself
+                    logging.info(f"No final bit found in Answer_{i}")
+                    df.at[idx, "Dimension Check"] = "unchecked: no final answer"
+                    follow_up_question = format_follow_up
+                else:
+                    consistent, inconsistency = check_dimension(unit_text(final_bit), expected_unit)
+                    logging.info(f"Extracted final bit from Answer_{i}: {final_bit} (dimension check: {consistent})")
+
+                    # Rows whose answer is consistent (or cannot be checked) skip the extra turns
+                    if consistent is None:
+                        df.at[idx, "Dimension Check"] = "unchecked"
+                        break
+                    if consistent:
+                        df.at[idx, "Dimension Check"] = "consistent" if i == 1 else f"consistent after {i - 1} follow-up(s)"
+                        break
+                    df.at[idx, "Dimension Check"] = f"inconsistent: {inconsistency}"
+                    follow_up_question = dimension_follow_up.format(snippet=final_bit, inconsistency=inconsistency)
+
+                # Send the follow-up if not the last iteration
+                if i < n_iterations:
+                    df.at[idx, f"Question_{i + 1}"] = follow_up_question
+                    messages.append({"role": "assistant", "content": answer})
+                    messages.append({"role": "user", "content": follow_up_question})
+
+        except Exception as e:
+            logging.error(f"An error occurred while processing row {idx + 1}: {e}")
+            # Fill remaining answers/questions with a placeholder, and drop the
+            # fingerprint so that the next run retries this row.
+            for j in range(i + 1, n_iterations + 1):
+                df.at[idx, f"Question_{j}"] = "Error: Unable to process."
+                df.at[idx, f"Answer_{j}"] = "Error: Unable to process."
+            df.at[idx, "Final Snippet"] = "Error: Unable to extract."
+            df.at[idx, FINGERPRINT_COLUMN] = ""
+        finally:
+            done.append(idx)
+
+        # Save progress every SAVE_EVERY questions
+        if n % SAVE_EVERY == 0:
+            logging.info(f"Saving progress at row {idx + 1}/{len(df)}.")
+            df.loc[df.index.isin(done)].to_csv(output_csv_path, index=False, sep=';')
+            logging.info(f"Progress saved to {output_csv_path}.")
+
+    # 5) Save the final results
+    metrics.log_report()
+    logging.info("All questions processed. Saving final results.")
+    df.to_csv(output_csv_path, index=False, sep=';')
+    logging.info(f"Final results saved to: {output_csv_path}")
+
+
+if __name__ == "__main__":
+    main(input_csv_path, output_csv_path)
@@ -1,53 +1,40 @@
 import pandas as pd
-import re
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from ollama import chat  # or from ollama import Ollama if you prefer an OO approach
 import logging
 # ---------------------------------------------------------------------
 # Custom libraries
 # ---------------------------------------------------------------------
-library_path = "/Users/vincentclerc/Documents/codes_lusenn/main-lusenn/SUBSEA-fatigue/subsea/src/libraries/"
+library_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "libraries")
 
 # Add the folder to sys.path if it's not already included
 if library_path not in sys.path:
     sys.path.append(library_path)
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-def extract_final_bit(answer: str):
-    """
-    Utility function to extract the text between <A> and <\A>.
-    Returns the content inside <A> ... <\\A>, or an empty string if not found.
-    """
-    pattern = r"<A>(.*?)<\\A>"
-    match = re.search(pattern, answer, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    return ""
 
-input_csv_path = '/Users/vincentclerc/Documents/Stanford/DCRP-StanfordMath/answer_questions/DATA/DatasetPython5.csv'
-output_csv_path = '/Users/vincentclerc/Documents/Stanford/DCRP-StanfordMath/answer_questions/DATA/DatasetPython5_answers.csv'
+from toolbox_textParsing import extract_final_bit
+from call_metrics import MetricsSink, timed_chat
+from run_manifest import FINGERPRINT_COLUMN, add_fingerprints, load_previous_results, merge_previous_results, question_id
+from scheduling import estimate_cost, load_token_history, log_schedule_report, order_rows
 
-# Log start of processing
-logging.info(f"Starting the process. Reading input CSV from: {input_csv_path}")
-
-# 1) Read the CSV
-df = pd.read_csv(input_csv_path, sep=';', engine='python')  
-logging.info(f"Input CSV loaded successfully. Total rows: {len(df)}")
-
-# 2) Prepare columns to store results
-full_answers = []
-final_snippets = []
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# 3) Process each question in the CSV
-for idx, row in df.iterrows():
-    logging.info(f"Processing row {idx + 1}/{len(df)}...")
+data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "DATA")
+input_csv_path = os.path.join(data_path, "DatasetPython5.csv")
+output_csv_path = os.path.join(data_path, "DatasetPython5_answers.csv")
 
-    # Extract relevant columns
-    question = row["Question"] if "Question" in df.columns else ""
-    logging.debug(f"Question: {question}")
+MODEL = "llama3.1:latest"
+MAX_RETRIES = 2  # Retries of a failed chat call before giving up on the row
+RESULT_COLUMNS = ["Full Answer", "Final Snippet"]
+WORKERS = 1  # Concurrent chat calls; raise together with OLLAMA_NUM_PARALLEL on the server
+SCHEDULE = "longest-first"  # Submission order of the stale rows, see scheduling.order_rows
+SAVE_EVERY = 100  # Save results every 100 questions
 
-    # Additional context or instructions
-    instructions = """You are a helpful physics assistant. 
+# Additional context or instructions
+instructions = """You are a helpful physics assistant. 
     You will be given a question with numeric variables. 
     Provide a thorough, step-by-step solution, but ensure that, at the very end, 
     you produce the final numeric result in the format:
@@ -63,6 +50,13 @@ for idx, row in df.iterrows():
     <A> 19 kg.m^3 <\\A>
     """
 
+
+def solve_row(idx, question, level_us, model, metrics, queued_at):
+    """
+    Sends one question to the model and returns (idx, full answer, final snippet).
+    """
+    logging.debug(f"Question: {question}")
+
     prompt = [
         {"role": "system", "content": instructions},
         {"role": "user", "content": question}
@@ -70,8 +64,9 @@ for idx, row in df.iterrows():
     logging.debug(f"Prompt prepared: {prompt}")
 
     # Call the local Llama API via Ollama
-    logging.info("Sending question to Llama API...")
-    response = chat(model="llama3.1:latest", messages=prompt, stream=False)
+    logging.info(f"Sending question of row {idx + 1} to Llama API...")
+    response = timed_chat(chat, metrics, model, prompt, max_retries=MAX_RETRIES, queued_at=queued_at,
+                          row=int(idx), question_id=question_id(question), level_us=level_us, iteration=1)
 
     # The 'response' object is typically a dict with "message".
     full_answer_str = response["message"]["content"]
@@ -79,17 +74,78 @@ for idx, row in df.iterrows():
 
     # Parse out the <A> ... <\A> portion
     final_bit = extract_final_bit(full_answer_str)
-    logging.info(f"Extracted final bit: {final_bit}")
-
-    # Store results
-    full_answers.append(full_answer_str)
-    final_snippets.append(final_bit)
-
-# 4) Add results to DataFrame
-df["Full Answer"] = full_answers
-df["Final Snippet"] = final_snippets
-
-# 5) Write results back to CSV
-logging.info(f"Writing output to: {output_csv_path}")
-df.to_csv(output_csv_path, index=False, sep=';')
-logging.info("Process completed successfully.")
+    logging.info(f"Extracted final bit of row {idx + 1}: {final_bit}")
+    return idx, full_answer_str, final_bit
+
+
+def main(input_csv_path, output_csv_path, model=MODEL, workers=WORKERS, schedule=SCHEDULE):
+    # Log start of processing
+    logging.info(f"Starting the process. Reading input CSV from: {input_csv_path}")
+
+    # 1) Read the CSV
+    df = pd.read_csv(input_csv_path, sep=';', engine='python')
+    logging.info(f"Input CSV loaded successfully. Total rows: {len(df)}")
+
+    # 2) Prepare columns to store results, reusing rows whose inputs did not change
+    for column in RESULT_COLUMNS:
+        df[column] = ""
+    add_fingerprints(df, instructions, model)
+    previous = load_previous_results(output_csv_path)
+    stale_rows = merge_previous_results(df, previous, RESULT_COLUMNS)
+    logging.info(f"{len(df) - len(stale_rows)} rows up to date, {len(stale_rows)} rows to solve.")
+
+    # Per-call metrics are appended next to the output CSV
+    metrics_path = os.path.splitext(output_csv_path)[0] + "_metrics.jsonl"
+    metrics = MetricsSink(metrics_path)
+
+    # 3) Order the stale rows by expected cost (level, question length, earlier runs)
+    questions = df["Question"].fillna("").astype(str) if "Question" in df.columns else pd.Series("", index=df.index)
+    levels = df["Level US"].fillna("").astype(str) if "Level US" in df.columns else pd.Series("", index=df.index)
+    by_question, by_level = load_token_history([metrics_path], [output_csv_path])
+    costs = [estimate_cost(questions[idx], levels[idx], by_question, by_level) for idx in stale_rows]
+    if stale_rows:
+        log_schedule_report(costs, workers)
+    stale_rows = [stale_rows[i] for i in order_rows(costs, schedule)]
+
+    # 4) Process each new or stale question, workers at a time
+    stale = set(stale_rows)
+    done = [idx for idx in df.index if idx not in stale]
+    queued_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(solve_row, idx, questions[idx], levels[idx], model, metrics, queued_at): idx
+                   for idx in stale_rows}
+        for n, future in enumerate(as_completed(futures), start=1):
+            idx = futures[future]
+            try:
+                _, full_answer_str, final_bit = future.result()
+                logging.info(f"Row {idx + 1}/{len(df)} done ({n}/{len(stale_rows)} stale).")
+
+                # Store results
+                df.at[idx, "Full Answer"] = full_answer_str
+                df.at[idx, "Final Snippet"] = final_bit
+            except Exception as e:
+                logging.error(f"An error occurred while processing row {idx + 1}: {e}")
+                # Placeholder results, and no fingerprint so that the next run retries this row
+                df.at[idx, "Full Answer"] = "Error: Unable to process."
+                df.at[idx, "Final Snippet"] = "Error: Unable to extract."
+                df.at[idx, FINGERPRINT_COLUMN] = ""
+            finally:
+                done.append(idx)
+
+            # Save progress every SAVE_EVERY questions
+            if n % SAVE_EVERY == 0:
+                logging.info(f"Saving progress at {n}/{len(stale_rows)} stale rows.")
+                df.loc[df.index.isin(done)].to_csv(output_csv_path, index=False, sep=';')
+                logging.info(f"Progress saved to {output_csv_path}.")
+    logging.info(f"{len(stale_rows)} rows solved in {time.perf_counter() - queued_at:.1f}s "
+                 f"with {workers} worker(s), {schedule} order.")
+
+    # 5) Write results back to CSV, with the Fingerprint column as the run manifest
+    metrics.log_report()
+    logging.info(f"Writing output to: {output_csv_path}")
+    df.to_csv(output_csv_path, index=False, sep=';')
+    logging.info("Process completed successfully.")
+
+
+if __name__ == "__main__":
+    main(input_csv_path, output_csv_path)